@@ -0,0 +1,316 @@
+import os
+import pickle
+from types import SimpleNamespace
+
+import pytest
+
+import wizardry
+
+SWORD = wizardry.ItemDefinition(1, "铁剑", "", "equipment", "⚔️", slot="weapon",
+                                effects=[wizardry.ItemEffect("attack", 5)])
+POTION = wizardry.ItemDefinition(2, "治疗药剂", "", "consumable", "❤️", max_stack=5,
+                                 effects=[wizardry.ItemEffect("health", 50)])
+
+
+def _default_map():
+    game_map = wizardry.GameMap()
+    game_map.generate_default_map()
+    return game_map
+
+
+def _game_stub():
+    player = SimpleNamespace(health=100, max_health=100, sp=10, max_sp=10, attack=10, defense=10)
+    return SimpleNamespace(player_info=player)
+
+
+def test_interaction_visits_only_the_target_cell():
+    game_map = _default_map()
+    door_x = game_map.height // 2
+    door = game_map.grid[door_x][5].behavior
+
+    game_map.visit_at(wizardry.InteractionHandler(None), door_x, 4)
+    assert not door.door_animating
+    game_map.visit_at(wizardry.InteractionHandler(None), -1, -1)
+
+    game_map.visit_at(wizardry.InteractionHandler(None), door_x, 5)
+    assert door.door_animating
+
+
+
+def _reference_cast(game_map, pos_x, pos_y, ray_dir_x, ray_dir_y):
+    """
+    逐格步进的参考实现（原 _cast_ray 的循环），与光线投射内核相互独立：
+    光线离开地图时命中边界墙，门无论开关都与墙一样挡住光线
+    :return: (cell, side, perp_dist)
+    """
+    map_x, map_y = int(pos_x), int(pos_y)
+    ray_length_x = abs(1 / ray_dir_x) if ray_dir_x != 0 else float("inf")
+    ray_length_y = abs(1 / ray_dir_y) if ray_dir_y != 0 else float("inf")
+    step_x = 1 if ray_dir_x >= 0 else -1
+    step_y = 1 if ray_dir_y >= 0 else -1
+    side_dist_x = ((pos_x - map_x) if ray_dir_x < 0 else (map_x + 1.0 - pos_x)) * ray_length_x
+    side_dist_y = ((pos_y - map_y) if ray_dir_y < 0 else (map_y + 1.0 - pos_y)) * ray_length_y
+
+    while True:
+        if side_dist_x < side_dist_y:
+            side_dist_x += ray_length_x
+            map_x += step_x
+            side = 0
+        else:
+            side_dist_y += ray_length_y
+            map_y += step_y
+            side = 1
+        if not game_map.is_valid_position(map_x, map_y):
+            cell = game_map.boundary_wall
+            break
+        cell = game_map.get_cell(map_x, map_y)
+        if cell.is_wall:
+            break
+
+    if side == 0:
+        perp_dist = (map_x - pos_x + (1 - step_x) / 2) / ray_dir_x
+    else:
+        perp_dist = (map_y - pos_y + (1 - step_y) / 2) / ray_dir_y
+    return cell, side, perp_dist
+
+
+def _turn(raycaster, turns):
+    for _ in range(turns):
+        raycaster.rotate()
+        while raycaster.rotating:
+            raycaster.update_rotation()
+
+
+def _open_door(game_map, x, y):
+    door = game_map.grid[x][y].behavior
+    door.on_interact(None, x, y)
+    door.update(1.0)
+    assert door.door_open
+
+
+@pytest.mark.parametrize("position, turns, width", [
+    ((1.5, 1.5), 0, 1),
+    ((1.5, 5.5), 0, 80),
+    ((3.5, 5.5), 1, 57),
+    ((8.5, 2.5), 3, 120),
+    ((6.5, 6.5), 2, 64),
+    ((-3.5, -2.5), 2, 33),  # 起点在地图外
+    ((12.5, 4.5), 0, 16),
+])
+def test_cast_all_matches_reference_dda(position, turns, width):
+    game_map = _default_map()
+    _open_door(game_map, game_map.height // 2, 5)
+    raycaster = wizardry.Raycaster(game_map)
+    raycaster.pos_x, raycaster.pos_y = position
+    _turn(raycaster, turns)
+
+    cells, sides, facings, wall_xs, distances = raycaster.cast_all(width)
+    for x in range(width):
+        camera_x = 2 * x / width - 1
+        cell, side, perp_dist = _reference_cast(
+            game_map, raycaster.pos_x, raycaster.pos_y,
+            raycaster.dir_x + raycaster.plane_x * camera_x, raycaster.dir_y + raycaster.plane_y * camera_x)
+        assert cells[x] is cell
+        assert sides[x] == side
+        assert distances[x] == pytest.approx(perp_dist)
+
+
+def test_cast_all_known_hits():
+    game_map = _default_map()
+    door_x = game_map.height // 2
+    raycaster = wizardry.Raycaster(game_map)
+    raycaster.pos_x, raycaster.pos_y = 1.5, 5.5  # 面向 +X，正前方为中间墙上的门
+    center = 20  # 宽度为偶数时中间一列的相机平面坐标恰为0
+
+    cells, sides, facings, wall_xs, distances = raycaster.cast_all(40)
+    assert cells[center] is game_map.grid[door_x][5]
+    assert (sides[center], distances[center]) == (0, pytest.approx(door_x - 1.5))
+
+    # 门开启后仍挡住光线（由门的渲染组件绘制门框）
+    _open_door(game_map, door_x, 5)
+    cells, sides, facings, wall_xs, distances = raycaster.cast_all(40)
+    assert cells[center] is game_map.grid[door_x][5]
+
+    # 没有外墙时光线在地图边缘命中边界墙
+    empty_map = wizardry.GameMap()
+    raycaster = wizardry.Raycaster(empty_map)
+    raycaster.pos_x, raycaster.pos_y = 1.5, 1.5
+    cells, sides, facings, wall_xs, distances = raycaster.cast_all(40)
+    assert all(cell is empty_map.boundary_wall for cell in cells)
+    assert distances[center] == pytest.approx(empty_map.height - 1.5)
+
+    # 起点在地图外时所有列都命中边界墙
+    raycaster.pos_x, raycaster.pos_y = -3.5, -2.5
+    cells = raycaster.cast_all(40)[0]
+    assert all(cell is empty_map.boundary_wall for cell in cells)
+
+
+def test_numba_warm_up_covers_frame_casts():
+    pytest.importorskip("numba")
+    raycaster = wizardry.Raycaster(wizardry.GameMap())
+    raycaster.warm_up()
+    signatures = len(wizardry._dda_trace_batch.signatures)
+    # 渲染时传入的是整数最大距离，仍应复用预热时编译的版本
+    raycaster.cast_all(80, 40)
+    assert len(wizardry._dda_trace_batch.signatures) == signatures
+
+
+def test_inventory_indexes_follow_stacking_and_removal():
+    inventory = wizardry.Inventory(capacity=5)
+    assert inventory.add_item(wizardry.Item(POTION, 4))
+    assert inventory.add_item(wizardry.Item(SWORD))
+    # 先补满已有堆叠，剩余数量放入新槽位
+    assert inventory.add_item(wizardry.Item(POTION, 3))
+    assert [item.count for item in inventory.items] == [5, 1, 2]
+    assert inventory._by_id == {POTION.id: [0, 2], SWORD.id: [1]}
+
+    inventory.remove_item(0, count=5)
+    assert inventory._by_id == {SWORD.id: [0], POTION.id: [1]}
+
+
+def test_equipping_into_an_occupied_slot_swaps_indexes_and_stats():
+    inventory = wizardry.Inventory(capacity=5)
+    game = _game_stub()
+    first, second = wizardry.Item(SWORD), wizardry.Item(SWORD)
+    assert inventory.add_item(first) and inventory.add_item(second)
+    assert inventory._by_id == {SWORD.id: [0, 1]}
+
+    inventory.equip_item(first, game)
+    inventory.equip_item(second, game)
+    assert not first.equipped and second.equipped
+    assert inventory._equipped_by_slot == {"weapon": second}
+    assert game.player_info.attack == 15
+
+    # 移除未装备的物品后槽位索引前移，装备索引与属性不受影响
+    assert inventory.remove_item(0) is first
+    assert inventory._by_id == {SWORD.id: [0]}
+    assert inventory._equipped_by_slot == {"weapon": second}
+    assert game.player_info.attack == 15
+
+    inventory.unequip_item(second, game)
+    assert not second.equipped
+    assert inventory._equipped_by_slot == {}
+    assert game.player_info.attack == 10
+
+
+def test_removing_an_equipped_item_clears_its_slot():
+    inventory = wizardry.Inventory(capacity=5)
+    sword = wizardry.Item(SWORD)
+    inventory.add_item(sword)
+    inventory.equip_item(sword, _game_stub())
+
+    assert inventory.remove_item(0) is sword
+    assert inventory._by_id == {}
+    assert inventory._equipped_by_slot == {}
+
+
+def test_item_display_caches_follow_count_and_equipped():
+    sword = wizardry.Item(SWORD)
+    assert sword.get_display_info() == "⚔️ 铁剑 x1"
+    assert "装备状态: 未装备" in sword.get_full_info()
+
+    sword.count = 3
+    assert sword.get_display_info() == "⚔️ 铁剑 x3"
+    assert "数量: 3/1" in sword.get_full_info()
+
+    sword.equipped = True
+    assert "装备状态: 已装备" in sword.get_full_info()
+
+    # 堆叠时通过 count 属性修改数量，显示文本同样失效
+    inventory = wizardry.Inventory()
+    potion = wizardry.Item(POTION, 2)
+    inventory.add_item(potion)
+    assert potion.get_display_info().endswith("x2")
+    inventory.add_item(wizardry.Item(POTION, 2))
+    assert potion.get_display_info().endswith("x4")
+
+
+class _CountingAnimation(wizardry.Animation):
+    def __init__(self, duration):
+        super().__init__(duration)
+        self.renders = 0
+
+    def render(self, stdscr, game):
+        self.renders += 1
+
+
+def test_animation_tick_updates_renders_and_prunes():
+    renderer = wizardry.AnimationRenderer()
+    short, long = _CountingAnimation(0.1), _CountingAnimation(1.0)
+    renderer.add_animation(short)
+    renderer.add_animation(long)
+
+    renderer.tick(None, None, 0.2)
+    assert renderer.active_animations == [long]
+    assert (short.renders, long.renders) == (0, 1)
+
+
+def test_animation_update_and_render_are_deprecated_wrappers():
+    renderer = wizardry.AnimationRenderer()
+    short, long = _CountingAnimation(0.1), _CountingAnimation(1.0)
+    renderer.add_animation(short)
+    renderer.add_animation(long)
+
+    with pytest.deprecated_call():
+        renderer.update(0.2)
+    with pytest.deprecated_call():
+        renderer.render(None, None)
+    assert renderer.active_animations == [long]
+    assert long.renders == 1
+
+
+def test_item_definitions_load_from_the_module_directory():
+    # 测试从仓库根目录运行，物品定义仍从模块所在目录加载
+    assert os.getcwd() != os.path.dirname(os.path.abspath(wizardry.__file__))
+    assert wizardry.ItemFactory.create_item(4) is not None
+
+
+@pytest.mark.parametrize("contents", [
+    b"",
+    b"not a cache file",
+    b"wizardry-item-cache 0 0.0 wizardry\n",
+])
+def test_item_cache_rejects_foreign_or_stale_files(tmp_path, contents):
+    json_file = tmp_path / "item.json"
+    json_file.write_text("[]", encoding="utf-8")
+    cache_file = tmp_path / "item.json.pkl"
+    cache_file.write_bytes(contents + pickle.dumps({1: "stale"}))
+
+    mtime = os.path.getmtime(json_file)
+    assert not wizardry.ItemFactory._load_cache(str(cache_file), mtime)
+
+
+def test_item_cache_round_trip(tmp_path):
+    cache_file = str(tmp_path / "item.json.pkl")
+    definitions = dict(wizardry.ItemFactory._item_definitions)
+    wizardry.ItemFactory._save_cache(cache_file, 1.5)
+    try:
+        assert not wizardry.ItemFactory._load_cache(cache_file, 2.5)
+        assert wizardry.ItemFactory._load_cache(cache_file, 1.5)
+        assert wizardry.ItemFactory._item_definitions.keys() == definitions.keys()
+
+        # 写入中断留下的残缺缓存按未命中处理
+        with open(cache_file, "rb") as f:
+            data = f.read()
+        with open(cache_file, "wb") as f:
+            f.write(data[:len(data) // 2])
+        assert not wizardry.ItemFactory._load_cache(cache_file, 1.5)
+    finally:
+        wizardry.ItemFactory._item_definitions.clear()
+        wizardry.ItemFactory._item_definitions.update(definitions)
+
+
+def test_level_up_exp_table_matches_exp_formula():
+    player = object.__new__(wizardry.PlayerInfo)
+    for level in range(1, 100):
+        player.level = level
+        expected = int(100 * level ** 1.5) - (0 if level <= 1 else int(100 * (level - 1) ** 1.5))
+        assert player.get_level_up_exp() == expected
+        assert wizardry.PlayerInfo._LEVEL_UP_EXP_TABLE[level] == (
+            wizardry.PlayerInfo._exp_required_for_level(level + 1)
+            - wizardry.PlayerInfo._exp_required_for_level(level))
+
+    player.level = -1
+    assert player.get_level_up_exp() == 0
+    player.level = 100
+    assert player.get_level_up_exp() == 0
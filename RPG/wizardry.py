@@ -1,36 +1,147 @@
 from abc import ABC, abstractmethod
+from array import array
 from dataclasses import dataclass, field
 from typing import Any, Callable, Dict, List, Optional, Union
 import curses
 import json
 import math
+import os
+import pickle
 import time
+import warnings
 
+try:
+    from numba import njit, prange
+    import numpy
+
+    def _kernel_buffer(buffer):
+        """numba 并行内核不接受 array.array/bytearray，传入与原缓冲区共享内存的 numpy 视图"""
+        return numpy.asarray(memoryview(buffer))
+except ImportError:  # 未安装numba时退化为普通Python函数
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+    prange = range
+
+    def _kernel_buffer(buffer):
+        return buffer
 
-# ====================== 1. 渲染组件 ======================
-class RenderContext:
-    """渲染上下文，封装渲染所需参数"""
 
-    def __init__(self, side, ray_dir_x, ray_dir_y, wall_x, distance, player_dir_x, player_dir_y):
-        self.side = side  # 碰撞面（0-垂直，1-水平）
-        self.ray_dir_x = ray_dir_x
-        self.ray_dir_y = ray_dir_y
-        self.wall_x = wall_x  # 墙面X坐标（0-1）
-        self.distance = distance  # 到墙面的距离
-        self.player_dir_x = player_dir_x  # 玩家方向向量X
-        self.player_dir_y = player_dir_y  # 玩家方向向量Y
+# ====================== 1. 渲染组件 ======================
+FAR_DISTANCE = 1e30  # 光线超出最大追踪距离时返回的距离（同时作为不限距离时的默认上限）
+
+
+@njit(cache=True, fastmath=True)
+def _dda_trace(pos_x, pos_y, map_x, map_y, frac_x, frac_y, ray_dir_x, ray_dir_y, ray_length_x, ray_length_y,
+               cells, stride, map_width, map_height, max_steps, max_dist):
+    """
+    DDA网格遍历（只使用基本类型，可被numba编译）
+    :param map_x: 起点所在格 int(pos_x)，与小数部分 frac_x = pos_x - map_x 一样对整帧不变，由调用方计算一次
+    :param ray_length_x: 光线沿X方向跨越一格的长度 |1/ray_dir_x|（分量为0时为极大值），由调用方预先计算
+    :param cells: 外围带一圈哨兵墙的扁平单元格类型数组，索引为 (x + 1) * stride + (y + 1)，
+                  非 CELL_FLOOR 表示阻挡光线；从地图内出发的光线必定在哨兵墙处停下，循环内无需越界检查
+    :param max_steps: 最大步数，防止方向分量接近0等退化情况下无限循环
+    :param max_dist: 最大追踪距离，下一条格线比它更远时提前结束
+    :return: (hit, side, map_x, map_y, perp_dist, wall_x)，hit 为命中单元格的类型，光线越界时为 CELL_BOUNDARY（起点在地图外时为0）；
+             超出最大距离时 hit 为0且 perp_dist 为 FAR_DISTANCE
+    """
+    # 步进方向与到第一条格线的距离用无分支算式求出：正向时为 1 - frac，反向时为 frac
+    step_x = (ray_dir_x >= 0) * 2 - 1
+    step_y = (ray_dir_y >= 0) * 2 - 1
+    side_dist_x = ((step_x + 1) // 2 - frac_x) * step_x * ray_length_x
+    side_dist_y = ((step_y + 1) // 2 - frac_y) * step_y * ray_length_y
+
+    # 扁平索引随所跨格线整数递增，循环内不再做乘法
+    index = (map_x + 1) * stride + map_y + 1
+    index_step_x = step_x * stride
+
+    side = 0
+    hit = 0
+    if not (0 <= map_x < map_height and 0 <= map_y < map_width):
+        # 起点在地图外（如传送到地图外）时没有哨兵墙兜底，只前进到第一条格线并按越界处理
+        if min(side_dist_x, side_dist_y) > max_dist:
+            return 0, side, map_x, map_y, FAR_DISTANCE, 0.0
+        if side_dist_x < side_dist_y:
+            map_x += step_x
+        else:
+            map_y += step_y
+            side = 1
+        max_steps = 0
+    for _ in range(max_steps):
+        # 下一条格线的距离即命中该格时的垂直距离，超出范围的墙面已不可见
+        if min(side_dist_x, side_dist_y) > max_dist:
+            return 0, side, map_x, map_y, FAR_DISTANCE, 0.0
+        if side_dist_x < side_dist_y:
+            side_dist_x += ray_length_x
+            map_x += step_x
+            index += index_step_x
+            side = 0
+        else:
+            side_dist_y += ray_length_y
+            map_y += step_y
+            index += step_y
+            side = 1
+
+        hit = cells[index]
+        if hit:
+            break
+
+    # 计算光线距离和墙面位置
+    if side == 0:
+        perp_dist = (map_x - pos_x + (1 - step_x) / 2) / ray_dir_x
+        wall_x = pos_y + perp_dist * ray_dir_y
+    else:
+        perp_dist = (map_y - pos_y + (1 - step_y) / 2) / ray_dir_y
+        wall_x = pos_x + perp_dist * ray_dir_x
+    return hit, side, map_x, map_y, perp_dist, wall_x - math.floor(wall_x)
+
+
+@njit(cache=True, fastmath=True, parallel=True)
+def _dda_trace_batch(count, pos_x, pos_y, ray_dir_xs, ray_dir_ys, ray_lengths_x, ray_lengths_y,
+                     cells, stride, map_width, map_height, max_steps, max_dist,
+                     out_hit, out_side, out_map_x, out_map_y, out_dist, out_wall_x):
+    """
+    对所有屏幕列执行DDA（各列互不相关，可并行），结果写入预分配的输出数组
+    :param count: 列数，显式传入（numba 并行循环无法对 array.array 取 len）
+    """
+    # 起点所在格及其小数部分对所有列相同，只计算一次
+    map_x0, map_y0 = int(pos_x), int(pos_y)
+    frac_x, frac_y = pos_x - map_x0, pos_y - map_y0
+    for i in prange(count):
+        hit, side, map_x, map_y, perp_dist, wall_x = _dda_trace(
+            pos_x, pos_y, map_x0, map_y0, frac_x, frac_y, ray_dir_xs[i], ray_dir_ys[i], ray_lengths_x[i], ray_lengths_y[i],
+            cells, stride, map_width, map_height, max_steps, max_dist)
+        out_hit[i] = hit
+        out_side[i] = side
+        out_map_x[i] = map_x
+        out_map_y[i] = map_y
+        out_dist[i] = perp_dist
+        out_wall_x[i] = wall_x
+
+
+ROTATE_STEPS = 4  # 每次旋转 2π/ROTATE_STEPS，朝向只取这几个离散角度
+# 各离散朝向的 (cos, sin)，按整数朝向索引查表，避免连续旋转矩阵相乘累积误差
+_SINCOS = tuple((math.cos(k * 2 * math.pi / ROTATE_STEPS), math.sin(k * 2 * math.pi / ROTATE_STEPS))
+                for k in range(ROTATE_STEPS))
 
 
 class Raycaster:
     """光线投射类"""
 
+    PLANE_LENGTH = 0.66  # 相机平面半宽（决定视野）
+
     def __init__(self, game_map):
         self.game_map = game_map
         self.pos_x = self.pos_y = 1.5
         self.dir_x, self.dir_y = 1, 0
-        self.plane_x, self.plane_y = 0, -0.66
+        self.plane_x, self.plane_y = 0, -self.PLANE_LENGTH
         self.move_distance = 1.0
-        self.rotate_angle = math.pi / 2
+        self.rotate_angle = 2 * math.pi / ROTATE_STEPS
+        self._rotation_step_index = 0  # 当前（或旋转中的目标）朝向在 _SINCOS 中的索引
+        self._dir_angle = 0.0  # 当前方向角（弧度）
+        self._target_angle = 0.0  # 旋转目标方向角（弧度）
         self.target_dir_x = self.dir_x
         self.target_dir_y = self.dir_y
         self.target_plane_x = self.plane_x
@@ -38,28 +149,64 @@ class Raycaster:
         self.rotating = False
         self.rotation_speed = 0.2
         self.rotation_progress = 0.0
+        self._rotation_track = []  # 预先计算的旋转轨迹 (dir_x, dir_y, plane_x, plane_y, angle)
+        self._rotation_frame = 0
+        self._camera_width = 0
+        self._camera_table = array('d')
+        # 光线投射输出数组（按屏幕宽度分配，每帧复用）
+        self._out_hit = array('l')
+        self._out_side = array('l')
+        self._out_map_x = array('l')
+        self._out_map_y = array('l')
+        self._out_dist = array('d')
+        self._out_wall_x = array('d')
+        self._out_views = ()  # 输出数组供内核写入的视图（见 _kernel_buffer）
+        # 各列光线方向及跨格长度，只在宽度、方向或相机平面变化时重新计算
+        self._ray_key = None
+        self._ray_tables = None
+        self._ray_views = ()
 
     def rotate(self, clockwise=True):
-        rot = self.rotate_angle * (-1 if clockwise else 1)
-        self.target_dir_x = self.dir_x * math.cos(rot) - self.dir_y * math.sin(rot)
-        self.target_dir_y = self.dir_x * math.sin(rot) + self.dir_y * math.cos(rot)
-        self.target_plane_x = self.plane_x * math.cos(rot) - self.plane_y * math.sin(rot)
-        self.target_plane_y = self.plane_x * math.sin(rot) + self.plane_y * math.cos(rot)
+        # 目标朝向由整数索引查表得到（初始方向 (1, 0) 与相机平面 (0, -L) 旋转 k 步），
+        # 旋转中再次按键时也从上一次的目标朝向继续，方向不会漂移
+        self._rotation_step_index = (self._rotation_step_index + (-1 if clockwise else 1)) % ROTATE_STEPS
+        cos_r, sin_r = _SINCOS[self._rotation_step_index]
+        self.target_dir_x = cos_r
+        self.target_dir_y = sin_r
+        self.target_plane_x = self.PLANE_LENGTH * sin_r
+        self.target_plane_y = -self.PLANE_LENGTH * cos_r
         self.rotating = True
         self.rotation_progress = 0.0
 
+        # 旋转期间端点不变、每帧推进固定步长，因此在按键时一次算出整段旋转轨迹
+        # 在角度空间插值，中间帧方向保持单位长度，视野不会收缩；相机平面由方向旋转90度得到
+        start_angle = self._dir_angle
+        self._target_angle += -self.rotate_angle if clockwise else self.rotate_angle
+        delta = self._target_angle - start_angle
+        plane_length = self.PLANE_LENGTH
+        track = []
+        progress = 0.0
+        while True:
+            progress += self.rotation_speed
+            if progress >= 1.0:
+                # 最后一帧直接使用查表得到的目标朝向
+                track.append((cos_r, sin_r, self.target_plane_x, self.target_plane_y, self._target_angle))
+                break
+            angle = start_angle + delta * progress
+            dir_x, dir_y = math.cos(angle), math.sin(angle)
+            track.append((dir_x, dir_y, plane_length * dir_y, -plane_length * dir_x, angle))
+        self._rotation_track = track
+        self._rotation_frame = 0
+
     def update_rotation(self):
         if not self.rotating: return
-        self.rotation_progress += self.rotation_speed
-        if self.rotation_progress >= 1.0:
-            self.dir_x, self.dir_y = self.target_dir_x, self.target_dir_y
-            self.plane_x, self.plane_y = self.target_plane_x, self.target_plane_y
+        self.dir_x, self.dir_y, self.plane_x, self.plane_y, self._dir_angle = self._rotation_track[self._rotation_frame]
+        self._rotation_frame += 1
+        self.rotation_progress = min(1.0, self._rotation_frame * self.rotation_speed)
+        if self._rotation_frame == len(self._rotation_track):
             self.rotating = False
-            return
-        self.dir_x = self.dir_x * (1 - self.rotation_progress) + self.target_dir_x * self.rotation_progress
-        self.dir_y = self.dir_y * (1 - self.rotation_progress) + self.target_dir_y * self.rotation_progress
-        self.plane_x = self.plane_x * (1 - self.rotation_progress) + self.target_plane_x * self.rotation_progress
-        self.plane_y = self.plane_y * (1 - self.rotation_progress) + self.target_plane_y * self.rotation_progress
+            # 旋转结束时把角度归一化到当前朝向索引，避免连续转向后角度无限增长
+            self._dir_angle = self._target_angle = self._rotation_step_index * self.rotate_angle
 
     def move(self, forward=True):
         move = self.move_distance * (1 if forward else -1)
@@ -74,38 +221,92 @@ class Raycaster:
         front_y = int(self.pos_y + self.dir_y * 0.7)
         return self.game_map.get_cell(front_x, front_y)
 
+    def get_camera_table(self, width):
+        """获取每列对应的相机平面坐标（范围[-1,1]，按宽度缓存）"""
+        if width != self._camera_width:
+            self._camera_table = array('d', [2 * x / width - 1 for x in range(width)])
+            self._out_hit = array('l', [0]) * width
+            self._out_side = array('l', [0]) * width
+            self._out_map_x = array('l', [0]) * width
+            self._out_map_y = array('l', [0]) * width
+            self._out_dist = array('d', [0.0]) * width
+            self._out_wall_x = array('d', [0.0]) * width
+            self._out_views = tuple(_kernel_buffer(buffer) for buffer in (
+                self._out_hit, self._out_side, self._out_map_x, self._out_map_y, self._out_dist, self._out_wall_x))
+            self._camera_width = width
+        return self._camera_table
+
+    def get_ray_tables(self, width):
+        """
+        获取各列光线方向与跨格长度 (ray_dir_xs, ray_dir_ys, ray_lengths_x, ray_lengths_y)
+        平移不改变光线方向，因此按 (宽度, 方向, 相机平面) 缓存
+        """
+        key = (width, self.dir_x, self.dir_y, self.plane_x, self.plane_y)
+        if key != self._ray_key:
+            camera_table = self.get_camera_table(width)
+            dir_x, dir_y, plane_x, plane_y = key[1:]
+            ray_dir_xs = array('d', [dir_x + plane_x * camera_x for camera_x in camera_table])
+            ray_dir_ys = array('d', [dir_y + plane_y * camera_x for camera_x in camera_table])
+            # 分量为0时用极大值代替无穷大，保证 fastmath 下比较仍然有效
+            self._ray_tables = (ray_dir_xs, ray_dir_ys,
+                                array('d', [abs(1 / ray_dir) if ray_dir != 0 else 1e30 for ray_dir in ray_dir_xs]),
+                                array('d', [abs(1 / ray_dir) if ray_dir != 0 else 1e30 for ray_dir in ray_dir_ys]))
+            self._ray_views = tuple(_kernel_buffer(table) for table in self._ray_tables)
+            self._ray_key = key
+        return self._ray_tables
+
+    def warm_up(self):
+        """
+        以实际参数类型投射一列光线，提前触发 numba 编译（或从磁盘缓存加载），
+        避免第一帧画面卡顿；未安装 numba 时只是一次普通调用
+        """
+        self.cast_all(1)
 
-class RaycastResult:
-    """封装光线投射结果，提供统一渲染接口"""
-
-    def __init__(self, cell, side, ray_dir_x, ray_dir_y, wall_x, distance, player_dir_x, player_dir_y):
-        self.cell = cell
-        self.side = side
-        self.ray_dir_x = ray_dir_x
-        self.ray_dir_y = ray_dir_y
-        self.wall_x = wall_x
-        self.distance = distance
-        self.player_dir_x = player_dir_x
-        self.player_dir_y = player_dir_y
-
-    def render(self):
-        context = RenderContext(
-            side=self.side,
-            ray_dir_x=self.ray_dir_x,
-            ray_dir_y=self.ray_dir_y,
-            wall_x=self.wall_x,
-            distance=self.distance,
-            player_dir_x=self.player_dir_x,
-            player_dir_y=self.player_dir_y
-        )
-        return self.cell.renderer.render_3d(context)
+    def cast_all(self, width, max_dist=FAR_DISTANCE):
+        """
+        一次投射所有屏幕列的光线
+        :param max_dist: 最大追踪距离，更远的列距离为 FAR_DISTANCE
+        :return: 按列排列的 (cells, sides, facings, wall_xs, distances)；
+                 sides/wall_xs/distances 为复用的输出数组，下次调用时会被覆盖
+        """
+        game_map = self.game_map
+        grid = game_map.grid
+        map_height, map_width = game_map.height, game_map.width
+        max_steps = map_width + map_height + 2  # 光线到达哨兵墙前最多跨越的格线数
+
+        # 参数类型保持固定（坐标与距离均为 float），预热时编译的特化版本才能被之后每帧复用
+        self.get_ray_tables(width)
+        _dda_trace_batch(width, float(self.pos_x), float(self.pos_y), *self._ray_views,
+                         game_map._cells_view, game_map._stride, map_width, map_height, max_steps, float(max_dist),
+                         *self._out_views)
+        hits, sides, map_xs, map_ys = self._out_hit, self._out_side, self._out_map_x, self._out_map_y
+        distances, wall_xs = self._out_dist, self._out_wall_x
+
+        # 未命中（命中哨兵墙或超出距离）时使用边界墙（门始终视为墙面，开启的门由渲染组件绘制门框）
+        boundary_wall = game_map.boundary_wall
+        cells = [grid[map_x][map_y] if CELL_FLOOR < hit < CELL_BOUNDARY else boundary_wall
+                 for hit, map_x, map_y in zip(hits, map_xs, map_ys)]
+
+        # 视线与碰撞面法向量（±1, 0）或（0, ±1）的点积平方只取决于碰撞面，
+        # 因此整帧只需按碰撞面计算一次是否正对墙面（|点积| > 0.5）
+        facing_by_side = (self.dir_x * self.dir_x > 0.25, self.dir_y * self.dir_y > 0.25)
+        facings = [facing_by_side[side] for side in sides]
+
+        return cells, sides, facings, wall_xs, distances
 
 
 class CellRenderer(ABC):
     """单元格渲染组件基类"""
 
     @abstractmethod
-    def render_3d(self, context: RenderContext) -> str: pass
+    def render_3d(self, side, wall_x, distance, facing) -> str:
+        """
+        渲染光线命中的一列
+        :param side: 碰撞面（0-垂直，1-水平）
+        :param wall_x: 命中点在墙面上的位置（0-1）
+        :param distance: 到墙面的垂直距离
+        :param facing: 玩家视线是否正对该面（法向量夹角小于60度）
+        """
 
     @abstractmethod
     def get_minimap_char(self) -> str: pass
@@ -121,25 +322,13 @@ class WallRenderer(CellRenderer):
 
     def __init__(self, texture_id):
         self.texture_id = texture_id
+        # 预先解析两种朝向的贴图字符
+        self._tex_h = self.TEXTURE_LIB[f"{texture_id}_horizontal"]
+        self._tex_v = self.TEXTURE_LIB[f"{texture_id}_vertical"]
 
-    def render_3d(self, context: RenderContext) -> str:
-        # 计算墙面法向量
-        if context.side == 0:  # 垂直面
-            wall_normal_x = 1 if context.ray_dir_x >= 0 else -1
-            wall_normal_y = 0
-        else:  # 水平面
-            wall_normal_x = 0
-            wall_normal_y = 1 if context.ray_dir_y >= 0 else -1
-
-        # 计算视线方向与法向量的夹角余弦值
-        dot_product = (context.player_dir_x * wall_normal_x +
-                      context.player_dir_y * wall_normal_y)
-
-        # 修正后的逻辑：
-        if abs(dot_product) > 0.5:  # 法向量与视线方向夹角小于60度 -> 正对墙面
-            return self.TEXTURE_LIB[f"{self.texture_id}_horizontal"]  # 水平图案
-        else:  # 侧面墙面
-            return self.TEXTURE_LIB[f"{self.texture_id}_vertical"]    # 垂直图案
+    def render_3d(self, side, wall_x, distance, facing) -> str:
+        # 正对墙面使用水平图案，侧面墙面使用垂直图案
+        return self._tex_h if facing else self._tex_v
 
     def get_minimap_char(self):
         return "#"
@@ -148,39 +337,29 @@ class WallRenderer(CellRenderer):
 class DoorRenderer(CellRenderer):
     """门渲染组件实现"""
 
+    FRAME_CHAR = "▐"  # 门框
+    OPEN_CHAR = " "  # 门洞
+    VERTICAL_CHAR = "|"  # 侧面看到的门板
+    HORIZONTAL_CHAR = "-"  # 正面看到的门板
+    # 门框在墙面X坐标上的内边界 (左, 右)：远处门框较细，靠近（距离小于1.5）时加粗
+    FRAME_BOUNDS_FAR = (0.15, 1 - 0.15)
+    FRAME_BOUNDS_NEAR = (0.25, 1 - 0.25)
+
     def __init__(self, behavior):
         self.behavior = behavior
 
-    def render_3d(self, context: RenderContext) -> str:
-        # 计算玩家视线方向与门法向量的角度
-        door_normal_x = 0
-        door_normal_y = 0
+    def render_3d(self, side, wall_x, distance, facing) -> str:
+        frame_left, frame_right = self.FRAME_BOUNDS_FAR if distance >= 1.5 else self.FRAME_BOUNDS_NEAR
+        if wall_x < frame_left or wall_x > frame_right:
+            return self.FRAME_CHAR
 
-        if context.side == 0:  # 垂直门
-            door_normal_x = 1 if context.ray_dir_x >= 0 else -1
-        else:  # 水平门
-            door_normal_y = 1 if context.ray_dir_y >= 0 else -1
+        # 门洞范围由门的行为在状态变化时预先计算
+        behavior = self.behavior
+        if behavior.gap_start <= wall_x <= behavior.gap_end:
+            return self.OPEN_CHAR
 
-        # 计算点积判断门的方向
-        dot_product = (context.player_dir_x * door_normal_x +
-                       context.player_dir_y * door_normal_y)
-
-        # 确定门的方向
-        door_direction = "vertical" if abs(dot_product) < 0.5 else "horizontal"
-
-        frame_thickness = 0.15 if context.distance >= 1.5 else 0.25
-        if context.wall_x < frame_thickness or context.wall_x > 1 - frame_thickness:
-            return "▐"
-
-        if self.behavior.door_animating:
-            threshold = 0.5 * (self.behavior.door_animation_progress
-                               if self.behavior.door_animation_type == "opening"
-                               else 1 - self.behavior.door_animation_progress)
-            if context.wall_x < 0.5 - threshold or context.wall_x > 0.5 + threshold:
-                return "|" if door_direction == "vertical" else "-"
-            return " "
-
-        return " " if self.behavior.door_open else "|" if door_direction == "vertical" else "-"
+        # 根据玩家是否正对门确定门板字符
+        return self.HORIZONTAL_CHAR if facing else self.VERTICAL_CHAR
 
     def get_minimap_char(self):
         return " " if self.behavior.door_open else "+"
@@ -189,7 +368,7 @@ class DoorRenderer(CellRenderer):
 class FloorRenderer(CellRenderer):
     """普通地板渲染组件实现"""
 
-    def render_3d(self, context: RenderContext) -> str: return " "
+    def render_3d(self, side, wall_x, distance, facing) -> str: return " "
 
     def get_minimap_char(self): return "."
 
@@ -200,7 +379,7 @@ class InteractiveFloorRenderer(CellRenderer):
     def __init__(self, behavior):
         self.behavior = behavior
 
-    def render_3d(self, context: RenderContext) -> str: return " "
+    def render_3d(self, side, wall_x, distance, facing) -> str: return " "
 
     def get_minimap_char(self): return "*" if self.behavior.triggered else "."
 
@@ -231,24 +410,31 @@ class FlashAnimation(Animation):
 
     def __init__(self):
         super().__init__(duration=0.5)  # 持续0.5秒
+        self._row = ""
 
     def render(self, stdscr, game):
         """渲染闪屏效果"""
         if int(self.elapsed_time * 10) % 2 == 0:  # 每0.1秒切换一次
             height, width = stdscr.getmaxyx()
+            if len(self._row) != width - 1:
+                self._row = "#" * (width - 1)
             for y in range(height):
                 try:
-                    stdscr.addstr(y, 0, "#" * (width - 1))
-                except:
+                    stdscr.addstr(y, 0, self._row)
+                except curses.error:
                     pass
 
 
 class InventoryTransitionAnimation(Animation):
     """物品栏过渡动画（调整为0.5秒）"""
 
+    SHADES = " ░▒▓█"  # 按透明度从低到高排列的覆盖字符
+
     def __init__(self, is_entering=True):
         super().__init__(duration=0.5)  # 调整为0.5秒
         self.is_entering = is_entering
+        self._panel_width = 0
+        self._panels = []
 
     def render(self, stdscr, game):
         """渲染淡入淡出效果（覆盖整个画面）"""
@@ -258,24 +444,18 @@ class InventoryTransitionAnimation(Animation):
         # 计算渐变系数（进入时从0到1，退出时从1到0）
         alpha = progress if self.is_entering else 1.0 - progress
 
+        # 每种透明度对应一整行覆盖字符串，按屏幕宽度缓存
+        if width != self._panel_width:
+            self._panels = [shade * width for shade in self.SHADES]
+            self._panel_width = width
+        row = self._panels[min(4, int(alpha * 5))]
+
         # 创建覆盖整个画面的覆盖层
         for y in range(height):
-            for x in range(width):
-                try:
-                    # 根据透明度选择字符
-                    if alpha < 0.2:
-                        char = " "
-                    elif alpha < 0.4:
-                        char = "░"
-                    elif alpha < 0.6:
-                        char = "▒"
-                    elif alpha < 0.8:
-                        char = "▓"
-                    else:
-                        char = "█"
-                    stdscr.addch(y, x, char)
-                except:
-                    pass
+            try:
+                stdscr.addstr(y, 0, row)
+            except curses.error:
+                pass
 
 
 class AnimationRenderer:
@@ -288,16 +468,29 @@ class AnimationRenderer:
         """添加新动画"""
         self.active_animations.append(animation)
 
+    def tick(self, stdscr, game, delta_time):
+        """在一次遍历中更新并渲染所有动画，同时移除已完成的动画"""
+        survivors = []
+        for animation in self.active_animations:
+            animation.update(delta_time)
+            if not animation.completed:
+                animation.render(stdscr, game)
+                survivors.append(animation)
+        self.active_animations = survivors
+
     def update(self, delta_time):
-        """更新所有动画状态"""
-        # 更新所有动画
-        for animation in self.active_animations[:]:
+        """更新所有动画状态并移除已完成的动画（已弃用，请使用 tick）"""
+        warnings.warn("AnimationRenderer.update() 已弃用，请使用 tick()", DeprecationWarning, stacklevel=2)
+        survivors = []
+        for animation in self.active_animations:
             animation.update(delta_time)
-            if animation.completed:
-                self.active_animations.remove(animation)
+            if not animation.completed:
+                survivors.append(animation)
+        self.active_animations = survivors
 
     def render(self, stdscr, game):
-        """渲染所有活动动画"""
+        """渲染所有活动动画（已弃用，请使用 tick）"""
+        warnings.warn("AnimationRenderer.render() 已弃用，请使用 tick()", DeprecationWarning, stacklevel=2)
         for animation in self.active_animations:
             animation.render(stdscr, game)
 
@@ -306,6 +499,21 @@ class AnimationRenderer:
 class CellBehavior(ABC):
     """单元格行为策略基类"""
 
+    __slots__ = ("observers",)
+
+    KIND = None  # 行为类型标记，用于替代 isinstance 判断
+
+    def __init__(self):
+        self.observers = []
+
+    # 观察者模式：状态变化时通知地图等订阅者
+    def add_observer(self, observer):
+        self.observers.append(observer)
+
+    def _notify_observers(self, event_type):
+        for observer in self.observers:
+            observer.on_cell_event(event_type, self)
+
     @abstractmethod
     def update(self, delta_time): pass
 
@@ -315,15 +523,40 @@ class CellBehavior(ABC):
     @abstractmethod
     def on_player_step(self, game, x, y): pass
 
+    def is_animating(self):
+        """是否正在播放动画（需要逐帧重绘）"""
+        return False
+
 
 class DoorBehavior(CellBehavior):
     """门的行为策略实现"""
 
+    __slots__ = ("door_open", "door_animating", "door_animation_type", "door_animation_progress",
+                 "gap_start", "gap_end")
+
+    KIND = "door"
+
     def __init__(self):
+        super().__init__()
         self.door_open = False
         self.door_animating = False
         self.door_animation_type = None
         self.door_animation_progress = 0.0
+        self._update_gap()
+
+    def _update_gap(self):
+        """
+        预先计算门洞在墙面上的范围 [gap_start, gap_end]（墙面X坐标），供渲染时直接比较
+        关闭时为空区间，完全开启时覆盖整个门面
+        """
+        if self.door_animating:
+            threshold = 0.5 * (self.door_animation_progress
+                               if self.door_animation_type == "opening"
+                               else 1 - self.door_animation_progress)
+        else:
+            threshold = 0.5 if self.door_open else -1.0
+        self.gap_start = 0.5 - threshold
+        self.gap_end = 0.5 + threshold
 
     def update(self, delta_time):
         if self.door_animating:
@@ -332,6 +565,11 @@ class DoorBehavior(CellBehavior):
                 self.door_animating = False
                 self.door_open = not self.door_open
                 self.door_animation_type = None
+                self._notify_observers("door_toggled")
+            self._update_gap()
+
+    def is_animating(self):
+        return self.door_animating
 
     def on_interact(self, game, x, y):
         if not self.door_animating:
@@ -341,6 +579,8 @@ class DoorBehavior(CellBehavior):
                 self.door_animation_type = "closing"
             else:
                 self.door_animation_type = "opening"
+            self._update_gap()
+            self._notify_observers("animation_started")
 
     def on_player_step(self, game, x, y):
         pass
@@ -349,7 +589,12 @@ class DoorBehavior(CellBehavior):
 class InteractiveFloorBehavior(CellBehavior):
     """互动地板行为策略实现"""
 
+    __slots__ = ("effect_type", "can_retrigger", "triggered", "trigger_time")
+
+    KIND = "interactive_floor"
+
     def __init__(self, effect_type=None, can_retrigger=False):
+        super().__init__()
         self.effect_type = effect_type
         self.can_retrigger = can_retrigger
         self.triggered = False
@@ -364,6 +609,7 @@ class InteractiveFloorBehavior(CellBehavior):
             self.triggered = True
             self.trigger_time = time.time()
             game.animation_renderer.add_animation(FlashAnimation())
+            self._notify_observers("floor_triggered")
             return True
         return False
 
@@ -388,28 +634,24 @@ class AnimationUpdater(MapVisitor):
 
 
 class InteractionHandler(MapVisitor):
-    """交互处理访问者实现"""
+    """交互处理访问者实现（通过 GameMap.visit_at 只访问目标单元格）"""
 
-    def __init__(self, game, x, y):
+    def __init__(self, game):
         self.game = game
-        self.x = x
-        self.y = y
 
     def visit_cell(self, cell, x, y):
-        if x == self.x and y == self.y and cell.behavior:
+        if cell.behavior:
             cell.behavior.on_interact(self.game, x, y)
 
 
 class StepHandler(MapVisitor):
-    """玩家踏步处理访问者实现"""
+    """玩家踏步处理访问者实现（通过 GameMap.visit_at 只访问目标单元格）"""
 
-    def __init__(self, game, x, y):
+    def __init__(self, game):
         self.game = game
-        self.x = x
-        self.y = y
 
     def visit_cell(self, cell, x, y):
-        if x == self.x and y == self.y and cell.behavior:
+        if cell.behavior:
             cell.behavior.on_player_step(self.game, x, y)
 
 
@@ -426,10 +668,10 @@ class DoorStatusProvider(StatusInfoProvider):
 
     def get_status_info(self, game, x, y) -> str:
         front_cell = game.raycaster.get_front_cell()
-        if not front_cell or not isinstance(front_cell.behavior, DoorBehavior):
+        behavior = front_cell.behavior if front_cell else None
+        if behavior is None or behavior.KIND != "door":
             return ""
 
-        behavior = front_cell.behavior
         if behavior.door_animating:
             return " [门状态变化中]" if not behavior.door_animation_type else \
                 " [开门中]" if behavior.door_animation_type == "opening" else " [关门中]"
@@ -441,15 +683,27 @@ class FloorStatusProvider(StatusInfoProvider):
 
     def get_status_info(self, game, x, y) -> str:
         current_cell = game.game_map.get_cell(x, y)
-        if not current_cell or not isinstance(current_cell.behavior, InteractiveFloorBehavior):
+        behavior = current_cell.behavior if current_cell else None
+        if behavior is None or behavior.KIND != "interactive_floor":
             return ""
-        return " [互动地板]" + ("已触发" if current_cell.behavior.triggered else "未触发")
+        return " [互动地板]" + ("已触发" if behavior.triggered else "未触发")
 
 
 # ====================== 6. 地图单元格 ======================
+# 单元格类型编码（GameMap._cells 中的取值）：光线遇到非地板即停止，门无论开关都会挡住光线，
+# 移动只被墙和关闭的门阻挡
+CELL_FLOOR = 0
+CELL_WALL = 1
+CELL_DOOR = 2
+CELL_OPEN_DOOR = 3
+CELL_BOUNDARY = 4  # 地图外围的哨兵墙，只出现在 _cells 的外圈
+
+
 class MapCell:
     """通用地图单元格"""
 
+    __slots__ = ("is_wall", "texture_id", "behavior", "renderer")
+
     def __init__(self, is_wall=False, texture_id="floor", behavior=None, renderer=None):
         self.is_wall = is_wall
         self.texture_id = texture_id
@@ -464,15 +718,24 @@ class MapCell:
 
 
 class CellFactory:
-    """单元格创建工厂"""
+    """
+    单元格创建工厂
+    普通地板和墙没有可变状态，所有位置共享同一个实例（享元）；门和互动地板带有各自的行为，每次新建
+    """
 
-    @staticmethod
-    def create_wall(texture_id="outer_wall"):
-        return MapCell(
-            is_wall=True,
-            texture_id=texture_id,
-            renderer=WallRenderer(texture_id)
-        )
+    _FLOOR = MapCell(is_wall=False, renderer=FloorRenderer())
+    _walls: Dict[str, MapCell] = {}  # texture_id -> 共享墙实例
+
+    @classmethod
+    def create_wall(cls, texture_id="outer_wall"):
+        wall = cls._walls.get(texture_id)
+        if wall is None:
+            wall = cls._walls[texture_id] = MapCell(
+                is_wall=True,
+                texture_id=texture_id,
+                renderer=WallRenderer(texture_id)
+            )
+        return wall
 
     @staticmethod
     def create_door():
@@ -484,12 +747,9 @@ class CellFactory:
             renderer=DoorRenderer(behavior)
         )
 
-    @staticmethod
-    def create_floor():
-        return MapCell(
-            is_wall=False,
-            renderer=FloorRenderer()
-        )
+    @classmethod
+    def create_floor(cls):
+        return cls._FLOOR
 
     @staticmethod
     def create_interactive_floor(can_retrigger=False):
@@ -507,7 +767,9 @@ class GameMap:
     def __init__(self, width=10, height=10):
         self.width = width
         self.height = height
-        self.grid = [[CellFactory.create_floor() for _ in range(width)] for _ in range(height)]
+        self.grid = [[CellFactory.create_floor()] * width for _ in range(height)]
+        self.boundary_wall = CellFactory.create_wall("outer_wall")  # 地图外的光线命中边界墙
+        self._rebuild_soa()
 
     def generate_default_map(self):
         # 创建外边界墙
@@ -527,21 +789,112 @@ class GameMap:
         self.grid[3][3] = CellFactory.create_interactive_floor(can_retrigger=True)
         self.grid[7][7] = CellFactory.create_interactive_floor(can_retrigger=False)
 
+        self._rebuild_soa()
+
+    def _rebuild_soa(self):
+        """
+        根据单元格网格重建扁平的SoA数组（索引为 x * width + y）及行为单元格索引
+        _cells: 单元格类型编码（CELL_*），供光线投射和碰撞检测直接读取；
+                外围多出一圈 CELL_BOUNDARY 哨兵墙，索引为 (x + 1) * _stride + (y + 1)；
+                _cells_view 为传给光线投射内核的共享内存视图
+        _active_cells: 带行为的单元格列表 (x, y, cell)，访问者只遍历这些单元格
+        _minimap_chars: 各单元格的小地图字符，只在行为状态变化时逐格更新
+        _animating_cells: 正在播放动画的行为 -> (x, y, cell)，每帧只推进这些单元格
+        """
+        self._stride = self.width + 2
+        self._cells = bytearray([CELL_BOUNDARY]) * (self._stride * (self.height + 2))
+        self._cells_view = _kernel_buffer(self._cells)
+        self._minimap_chars = [" "] * (self.width * self.height)
+        self._minimap_rows = {}  # 小地图窗口尺寸 -> 各行字符串
+        self._behavior_positions = {}
+        self._active_cells = []
+        self._animating_cells = {}
+        for i in range(self.height):
+            for j in range(self.width):
+                cell = self.grid[i][j]
+                index = i * self.width + j
+                cell_index = (i + 1) * self._stride + j + 1
+                self._cells[cell_index] = CELL_WALL if cell.is_wall else CELL_FLOOR
+                self._minimap_chars[index] = cell.get_minimap_char()
+                if cell.behavior:
+                    self._active_cells.append((i, j, cell))
+                    self._behavior_positions[cell.behavior] = (i, j)
+                    if cell.behavior.is_animating():
+                        self._animating_cells[cell.behavior] = (i, j, cell)
+                    if self not in cell.behavior.observers:
+                        cell.behavior.add_observer(self)
+                    if cell.behavior.KIND == "door":
+                        self._cells[cell_index] = CELL_OPEN_DOOR if cell.behavior.door_open else CELL_DOOR
+
+    def on_cell_event(self, event_type, behavior):
+        """单元格行为状态变化回调"""
+        if event_type == "door_toggled":
+            x, y = self._behavior_positions[behavior]
+            self._wall_changed(x, y)
+            self._minimap_changed(x, y)
+        elif event_type == "floor_triggered":
+            self._minimap_changed(*self._behavior_positions[behavior])
+        elif event_type == "animation_started":
+            x, y = self._behavior_positions[behavior]
+            self._animating_cells[behavior] = (x, y, self.grid[x][y])
+
+    def _wall_changed(self, x, y):
+        """同步门的开关状态到单元格类型数组"""
+        self._cells[(x + 1) * self._stride + y + 1] = CELL_OPEN_DOOR if self.grid[x][y].behavior.door_open else CELL_DOOR
+
+    def _minimap_changed(self, x, y):
+        """更新单个单元格的小地图字符，并使缓存的小地图行失效"""
+        self._minimap_chars[x * self.width + y] = self.grid[x][y].get_minimap_char()
+        self._minimap_rows.clear()
+
+    def get_minimap_rows(self, size):
+        """
+        获取小地图窗口（X、Y均为 0..size-1）的各行字符串，按尺寸缓存
+        自上而下Y递减，每行按X递增排列；地图外的位置为空格
+        """
+        rows = self._minimap_rows.get(size)
+        if rows is None:
+            chars, width = self._minimap_chars, self.width
+            rows = ["".join(chars[x * width + y] if x < self.height and y < width else " " for x in range(size))
+                    for y in range(size - 1, -1, -1)]
+            self._minimap_rows[size] = rows
+        return rows
+
     def is_valid_position(self, x, y):
         return 0 <= x < self.height and 0 <= y < self.width
 
     def is_wall(self, x, y):
-        if not self.is_valid_position(x, y): return True
-        cell = self.grid[x][y]
-        return cell.is_wall and not (isinstance(cell.behavior, DoorBehavior) and cell.behavior.door_open)
+        if not (0 <= x < self.height and 0 <= y < self.width): return True
+        cell_type = self._cells[(x + 1) * self._stride + y + 1]
+        return cell_type == CELL_WALL or cell_type == CELL_DOOR
 
     def get_cell(self, x, y):
-        return self.grid[x][y] if self.is_valid_position(x, y) else None
+        return self.grid[x][y] if 0 <= x < self.height and 0 <= y < self.width else None
+
+    def is_animating(self):
+        """是否有单元格正在播放动画"""
+        return bool(self._animating_cells)
+
+    def update_animations(self, delta_time):
+        """只让动画更新访问者访问正在播放动画的单元格，动画结束的单元格随即移出列表"""
+        if not self._animating_cells:
+            return
+        visitor = AnimationUpdater(delta_time)
+        for behavior, (x, y, cell) in list(self._animating_cells.items()):
+            cell.accept_visitor(visitor, x, y)
+            if not behavior.is_animating():
+                del self._animating_cells[behavior]
 
     def accept_visitor(self, visitor):
-        for i in range(self.height):
-            for j in range(self.width):
-                self.grid[i][j].accept_visitor(visitor, i, j)
+        """让访问者遍历所有带行为的单元格（无行为的单元格不会产生任何效果）"""
+        for i, j, cell in self._active_cells:
+            cell.accept_visitor(visitor, i, j)
+
+    def visit_at(self, visitor, x, y):
+        """让访问者只访问指定位置的单元格"""
+        cell = self.get_cell(x, y)
+        if cell:
+            cell.accept_visitor(visitor, x, y)
 
 
 # ====================== 7. 物品系统 ======================
@@ -571,10 +924,33 @@ class ItemDefinition:
 class Item:
     """物品实例"""
 
+    __slots__ = ("definition", "_count", "_equipped", "_display_cache", "_full_info_cache")
+
     def __init__(self, definition: ItemDefinition, count: int = 1):
         self.definition = definition
-        self.count = count
-        self.equipped = False  # 是否装备
+        self._count = count
+        self._equipped = False  # 是否装备
+        # 显示文本缓存，数量或装备状态变化时失效
+        self._display_cache: Optional[str] = None
+        self._full_info_cache: Optional[List[str]] = None
+
+    @property
+    def count(self):
+        return self._count
+
+    @count.setter
+    def count(self, value):
+        self._count = value
+        self._display_cache = self._full_info_cache = None
+
+    @property
+    def equipped(self):
+        return self._equipped
+
+    @equipped.setter
+    def equipped(self, value):
+        self._equipped = value
+        self._full_info_cache = None
 
     @property
     def id(self):
@@ -610,10 +986,15 @@ class Item:
 
     def get_display_info(self):
         """获取显示信息"""
-        return f"{self.icon} {self.name} x{self.count}"
+        if self._display_cache is None:
+            self._display_cache = f"{self.icon} {self.name} x{self.count}"
+        return self._display_cache
 
     def get_full_info(self):
         """获取完整信息（用于详情显示）"""
+        if self._full_info_cache is not None:
+            return self._full_info_cache
+
         info = [
             f"名称: {self.name}",
             f"类型: {self.get_type_name()}",
@@ -640,6 +1021,7 @@ class Item:
                 }.get(effect.effect_type, effect.effect_type)
                 info.append(f"  - {effect_name}: {effect.value:+}")
 
+        self._full_info_cache = info
         return info
 
     def get_type_name(self):
@@ -665,6 +1047,9 @@ class ItemFactory:
     _item_definitions: Dict[int, ItemDefinition] = {}
     _function_registry: Dict[str, Callable] = {}  # 函数注册表
 
+    CACHE_FORMAT = "wizardry-item-cache"  # 缓存文件头标识
+    CACHE_VERSION = 1  # 物品定义结构（ItemDefinition 等）变化时递增，使旧缓存失效
+
     @classmethod
     def register_function(cls, name: str, func: Callable):
         """注册效果函数"""
@@ -672,7 +1057,16 @@ class ItemFactory:
 
     @classmethod
     def load_definitions(cls, json_file: str):
-        """从JSON文件加载物品定义"""
+        """从JSON文件加载物品定义（JSON未修改时直接读取缓存）"""
+        cache_file = json_file + ".pkl"
+        try:
+            mtime = os.path.getmtime(json_file)
+        except OSError:
+            mtime = None
+
+        if mtime is not None and cls._load_cache(cache_file, mtime):
+            return
+
         try:
             with open(json_file, 'r', encoding='utf-8') as f:
                 definitions = json.load(f)
@@ -680,6 +1074,45 @@ class ItemFactory:
             print(f"错误：物品定义文件 {json_file} 未找到。")
             definitions = []
 
+        cls._parse_definitions(definitions)
+        if mtime is not None:
+            cls._save_cache(cache_file, mtime)
+
+    @classmethod
+    def _cache_header(cls, mtime: float) -> bytes:
+        """缓存头：格式标识、版本、JSON修改时间及定义所属模块，以纯文本写入，无需反序列化即可校验"""
+        return f"{cls.CACHE_FORMAT} {cls.CACHE_VERSION} {mtime!r} {__name__}\n".encode()
+
+    @classmethod
+    def _load_cache(cls, cache_file: str, mtime: float) -> bool:
+        """读取物品定义缓存，缓存缺失、过期或读取出错时均返回False（按未命中处理）"""
+        try:
+            with open(cache_file, 'rb') as f:
+                # 缓存头与当前格式、版本及JSON修改时间完全一致时才反序列化定义表
+                if f.readline() != cls._cache_header(mtime):
+                    return False
+                definitions = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            return False
+        if not isinstance(definitions, dict):
+            return False
+        cls._item_definitions.clear()
+        cls._item_definitions.update(definitions)
+        return True
+
+    @classmethod
+    def _save_cache(cls, cache_file: str, mtime: float):
+        """保存物品定义缓存（写入失败时忽略）"""
+        try:
+            with open(cache_file, 'wb') as f:
+                f.write(cls._cache_header(mtime))
+                pickle.dump(cls._item_definitions, f, pickle.HIGHEST_PROTOCOL)
+        except (OSError, pickle.PicklingError):
+            pass
+
+    @classmethod
+    def _parse_definitions(cls, definitions: List[Dict[str, Any]]):
+        """根据JSON数据创建物品定义"""
         cls._item_definitions.clear()
         for item_data in definitions:
             # 创建效果列表
@@ -724,7 +1157,50 @@ class ItemFactory:
         return None
 
 
-ItemFactory.load_definitions("item.json")
+# 物品定义及其缓存放在模块所在目录，与启动时的工作目录无关
+ItemFactory.load_definitions(os.path.join(os.path.dirname(os.path.abspath(__file__)), "item.json"))
+
+
+def _apply_max_health(player, value, multiplier):
+    player.max_health += value * multiplier
+    player.health = min(player.health, player.max_health)
+
+
+def _apply_max_sp(player, value, multiplier):
+    player.max_sp += value * multiplier
+    player.sp = min(player.sp, player.max_sp)
+
+
+def _apply_attack(player, value, multiplier):
+    player.attack += value * multiplier
+
+
+def _apply_defense(player, value, multiplier):
+    player.defense += value * multiplier
+
+
+# 装备效果分派表：effect_type -> 应用函数(player, value, multiplier)
+# 装备上的 health/sp 效果作用于上限
+EQUIPMENT_EFFECT_APPLIERS: Dict[str, Callable] = {
+    "health": _apply_max_health,
+    "max_health": _apply_max_health,
+    "sp": _apply_max_sp,
+    "max_sp": _apply_max_sp,
+    "attack": _apply_attack,
+    "defense": _apply_defense,
+}
+
+# 消耗品数值效果分派表：effect_type -> 应用函数(player, value)
+# 消耗品上的 health/sp 效果恢复当前值，max_* 效果提高上限
+CONSUMABLE_EFFECT_APPLIERS: Dict[str, Callable] = {
+    "health": lambda player, value: player.heal(value),
+    "sp": lambda player, value: player.restore_sp(value),
+    "exp": lambda player, value: player.add_exp(value),
+    "attack": lambda player, value: _apply_attack(player, value, 1),
+    "defense": lambda player, value: _apply_defense(player, value, 1),
+    "max_health": lambda player, value: _apply_max_health(player, value, 1),
+    "max_sp": lambda player, value: _apply_max_sp(player, value, 1),
+}
 
 
 class Inventory:
@@ -736,12 +1212,21 @@ class Inventory:
         self.selected_index = 0  # 当前选中的物品索引
         self.scroll_offset = 0  # 滚动偏移量
         self.visible_slots = 8  # 可见物品槽位数量
+        self._by_id: Dict[int, List[int]] = {}  # 物品ID -> 所在槽位索引列表（升序）
+        self._equipped_by_slot: Dict[str, Item] = {}  # 装备部位 -> 已装备物品
+
+    def _rebuild_index(self):
+        """物品列表顺序变化后重建物品ID索引"""
+        self._by_id = {}
+        for index, item in enumerate(self.items):
+            self._by_id.setdefault(item.id, []).append(index)
 
     def add_item(self, item: Item) -> bool:
         """添加物品到物品栏"""
-        # 尝试堆叠相同物品
-        for existing in self.items:
-            if existing.id == item.id and existing.count < existing.max_stack:
+        # 尝试堆叠相同物品（只检查相同ID的槽位）
+        for index in self._by_id.get(item.id, ()):
+            existing = self.items[index]
+            if existing.count < existing.max_stack:
                 stack_space = existing.max_stack - existing.count
                 if item.count <= stack_space:
                     existing.count += item.count
@@ -752,6 +1237,7 @@ class Inventory:
 
         # 添加新物品
         if len(self.items) < self.capacity:
+            self._by_id.setdefault(item.id, []).append(len(self.items))
             self.items.append(item)
             return True
         return False
@@ -767,6 +1253,9 @@ class Inventory:
 
             if count >= item.count:
                 removed = self.items.pop(index)
+                self._rebuild_index()
+                if self._equipped_by_slot.get(removed.slot) is removed:
+                    del self._equipped_by_slot[removed.slot]
                 # 调整选中索引
                 if self.selected_index >= len(self.items):
                     self.selected_index = max(0, len(self.items) - 1)
@@ -810,12 +1299,13 @@ class Inventory:
             return "无法装备此物品"
 
         # 检查是否已装备同部位物品
-        for existing in self.items:
-            if existing.equipped and existing.slot == item.slot:
-                existing.equipped = False
-                self._apply_equipment_effects(existing, game, remove=True)
+        existing = self._equipped_by_slot.get(item.slot)
+        if existing is not None:
+            existing.equipped = False
+            self._apply_equipment_effects(existing, game, remove=True)
 
         item.equipped = True
+        self._equipped_by_slot[item.slot] = item
         self._apply_equipment_effects(item, game)
         return f"已装备 {item.name}"
 
@@ -825,6 +1315,8 @@ class Inventory:
             return "此物品未装备"
 
         item.equipped = False
+        if self._equipped_by_slot.get(item.slot) is item:
+            del self._equipped_by_slot[item.slot]
         self._apply_equipment_effects(item, game, remove=True)
         return f"已卸下 {item.name}"
 
@@ -834,22 +1326,9 @@ class Inventory:
         player = game.player_info
 
         for effect in item.definition.effects:
-            if effect.effect_type == "health":
-                player.max_health += effect.value * multiplier
-                player.health = min(player.health, player.max_health)
-            elif effect.effect_type == "sp":
-                player.max_sp += effect.value * multiplier
-                player.sp = min(player.sp, player.max_sp)
-            elif effect.effect_type == "attack":
-                player.attack += effect.value * multiplier
-            elif effect.effect_type == "defense":
-                player.defense += effect.value * multiplier
-            elif effect.effect_type == "max_health":
-                player.max_health += effect.value * multiplier
-                player.health = min(player.health, player.max_health)
-            elif effect.effect_type == "max_sp":
-                player.max_sp += effect.value * multiplier
-                player.sp = min(player.sp, player.max_sp)
+            apply = EQUIPMENT_EFFECT_APPLIERS.get(effect.effect_type)
+            if apply:
+                apply(player, effect.value, multiplier)
 
 
 # ====================== 8. 玩家信息 ======================
@@ -899,29 +1378,41 @@ class PlayerInfo:
         self.attack = 10  # 重置攻击
         self.defense = 10  # 重置防御
 
-    @staticmethod
-    def _exp_required_for_level(level):
-        """计算升到指定等级所需的总经验值"""
+    # 各等级所需总经验值表（索引为等级，覆盖到最高级的下一级）
+    # 基础经验函数：f(level) = 100 * (level-1)^1.5，1级时为0
+    _EXP_TABLE = tuple(0 if level <= 1 else int(100 * (level - 1) ** 1.5) for level in range(102))
+    # 各等级升到下一级所需经验（索引为当前等级 0..100）
+    _LEVEL_UP_EXP_TABLE = tuple(next_exp - exp for exp, next_exp in zip(_EXP_TABLE, _EXP_TABLE[1:]))
+
+    @classmethod
+    def _exp_required_for_level(cls, level):
+        """获取升到指定等级所需的总经验值"""
         # 确保1级时经验需求为0
         if level <= 1:
             return 0
-        # 基础经验函数：二次函数增长
-        # 公式：f(level) = 100 * (level-1)^1.5
+        if level < len(cls._EXP_TABLE):
+            return cls._EXP_TABLE[level]
         return int(100 * (level - 1) ** 1.5)
 
     def get_level_up_exp(self):
         """获取升到下一级所需经验"""
         if self.level >= 100:
             return 0
+        if 0 <= self.level < len(self._LEVEL_UP_EXP_TABLE):
+            return self._LEVEL_UP_EXP_TABLE[self.level]
+        # 表外的等级（负数）按同一经验公式计算，结果与查表一致
         return self._exp_required_for_level(self.level + 1) - self._exp_required_for_level(self.level)
 
+    def get_current_level_exp(self):
+        """获取当前等级已获得的经验值（确保非负）"""
+        return max(0, self.exp - self._exp_required_for_level(self.level))
+
     def get_current_level_progress(self):
         """获取当前等级进度（0.0-1.0）"""
         if self.level >= 100:
             return 1.0
 
-        # 计算当前等级已获得经验（确保非负）
-        current_exp = max(0, self.exp - self._exp_required_for_level(self.level))
+        current_exp = self.get_current_level_exp()
         level_up_exp = self.get_level_up_exp()
 
         # 避免除以零错误
@@ -1039,6 +1530,8 @@ class PlayerInfo:
         self.observers.append(observer)
 
     def _notify_observers(self, event_type):
+        if not self.observers:  # 通常没有订阅者，直接返回
+            return
         for observer in self.observers:
             observer.on_player_event(event_type, self)
 
@@ -1058,15 +1551,27 @@ class StatusInfoManager:
 class GameRenderer:
     """游戏渲染器"""
 
+    COMPASS = "东北西南"  # 按朝向索引排列的方位名
+    ARROWS = "→↓←↑"  # 按朝向索引排列的小地图箭头（小地图Y轴翻转）
+    # 按格数（0-10）索引的状态条
+    HEALTH_BARS = tuple("♥" * count + "♡" * (10 - count) for count in range(11))
+    SP_BARS = tuple("✦" * count + "✧" * (10 - count) for count in range(11))
+    EXP_BARS = tuple("■" * count + "□" * (10 - count) for count in range(11))
+
     def __init__(self):
         self.status_manager = StatusInfoManager()
-        self.boundary_wall = CellFactory.create_wall("outer_wall")
         self.player_info = PlayerInfo()
+        # 墙面列字符串缓存：(wall_char, draw_start, draw_end) -> 第1行到第render_height行的整列字符串
+        self._column_cache = {}
+        self._column_cache_height = None
+        # 状态栏文本缓存，按玩家属性失效
+        self._hud_key = None
+        self._hud_lines = []
 
     def render_game(self, stdscr, game):
         """渲染游戏主画面"""
         height, width = stdscr.getmaxyx()
-        stdscr.clear()
+        stdscr.erase()  # 只清空缓冲，不强制终端整屏重绘
 
         # 定义边栏宽度
         sidebar_width = 30
@@ -1075,199 +1580,145 @@ class GameRenderer:
         render_height = height - 2
         render_width = width - sidebar_width
 
-        # 3D视图渲染
-        for x in range(render_width):
-            # 计算光线方向
-            camera_x = 2 * x / render_width - 1  # x坐标在屏幕上的位置，范围[-1,1]
-            ray_dir_x = game.raycaster.dir_x + game.raycaster.plane_x * camera_x
-            ray_dir_y = game.raycaster.dir_y + game.raycaster.plane_y * camera_x
-
-            ray_result = self._cast_ray(game.raycaster, ray_dir_x, ray_dir_y)
-            wall_char = ray_result.render()
-            wall_height = min(int(render_height / ray_result.distance), int(render_height * 0.9))
-            draw_start = max(1, render_height // 2 - wall_height // 2)
-            draw_end = min(render_height, render_height // 2 + wall_height // 2)
-
-            for y in range(draw_start, draw_end + 1):
-                try:
-                    stdscr.addch(y, x, wall_char)
-                except:
-                    pass
+        # 3D视图渲染（先批量投射所有列，逐列拼出整列字符串，再转置为行整行输出）
+        raycaster = game.raycaster
+        # 距离超过视图高度后墙面只剩地平线上的一格，再远一倍仍未命中则不再追踪
+        max_dist = render_height * 2
+        cells, sides, facings, wall_xs, distances = raycaster.cast_all(render_width, max_dist)
+        draw_starts, draw_ends = self._column_spans(distances, render_height, max_dist)
+        if render_height != self._column_cache_height:
+            self._column_cache.clear()
+            self._column_cache_height = render_height
+        column_cache = self._column_cache
+        columns = []
+        for cell, side, wall_x, distance, facing, draw_start, draw_end in zip(
+                cells, sides, wall_xs, distances, facings, draw_starts, draw_ends):
+            key = (cell.renderer.render_3d(side, wall_x, distance, facing), draw_start, draw_end)
+            column = column_cache.get(key)
+            if column is None:
+                # 第0行为操作提示，墙面列从第1行开始
+                column = " " * (draw_start - 1) + key[0] * (draw_end - draw_start + 1) + " " * (render_height - draw_end)
+                column_cache[key] = column
+            columns.append(column)
+        # 墙面行位于第1行到第 height-2 行、宽度小于屏幕宽度，不会写到右下角；
+        # 只在整个循环外捕获终端尺寸变化导致的错误
+        try:
+            for y, row in enumerate(zip(*columns), 1):
+                stdscr.addstr(y, 0, "".join(row))
+        except curses.error:
+            pass
 
         # 状态栏渲染
-        angle = math.degrees(math.atan2(-game.raycaster.dir_y, game.raycaster.dir_x))
-        direction = "北" if 45 <= angle < 135 else "西" if 135 <= angle < 225 else "南" if 225 <= angle < 315 else "东"
+        direction = self.COMPASS[self._get_heading(raycaster.dir_x, raycaster.dir_y)]
         status = [
-            f"位置: ({int(game.raycaster.pos_x)}, {int(game.raycaster.pos_y)}) 方向: {direction}",
+            f"位置: ({int(raycaster.pos_x)}, {int(raycaster.pos_y)}) 方向: {direction}",
             self.status_manager.get_status_info(game)
         ]
         try:
             stdscr.addstr(0, 0, "W:前进 A:左转 D:右转 S:向后转 空格:开门 Q:退出")
             stdscr.addstr(height - 2, 0, status[0])
             stdscr.addstr(height - 1, 0, status[1])
-        except:
+        except curses.error:
             pass
 
         # 小地图渲染
-        self._render_minimap(stdscr, game.raycaster, render_width)
-
-    def _cast_ray(self, raycaster, ray_dir_x, ray_dir_y):
-        pos_x, pos_y = raycaster.pos_x, raycaster.pos_y
-        map_x, map_y = int(pos_x), int(pos_y)
-
-        ray_length_x = abs(1 / ray_dir_x) if ray_dir_x != 0 else float('inf')
-        ray_length_y = abs(1 / ray_dir_y) if ray_dir_y != 0 else float('inf')
-
-        step_x = 1 if ray_dir_x >= 0 else -1
-        step_y = 1 if ray_dir_y >= 0 else -1
-
-        if ray_dir_x < 0:
-            side_dist_x = (pos_x - map_x) * ray_length_x
-        else:
-            side_dist_x = (map_x + 1.0 - pos_x) * ray_length_x
-
-        if ray_dir_y < 0:
-            side_dist_y = (pos_y - map_y) * ray_length_y
-        else:
-            side_dist_y = (map_y + 1.0 - pos_y) * ray_length_y
-
-        hit = 0
-        side = 0
-        door_cell = None
-        cell = None  # 显式初始化为None
-
-        while hit == 0:
-            if side_dist_x < side_dist_y:
-                side_dist_x += ray_length_x
-                map_x += step_x
-                side = 0
-            else:
-                side_dist_y += ray_length_y
-                map_y += step_y
-                side = 1
-
-            # 检查位置是否有效
-            if not raycaster.game_map.is_valid_position(map_x, map_y):
-                hit = 1
-                cell = self.boundary_wall  # 使用边界墙
-                break
-
-            cell = raycaster.game_map.get_cell(map_x, map_y)
-
-            if isinstance(cell.behavior, DoorBehavior) and (
-                    not cell.behavior.door_open or cell.behavior.door_animating):
-                door_cell = cell
-                hit = 1
-            elif cell.is_wall:
-                hit = 1
+        self._render_minimap(stdscr, raycaster, render_width)
 
-        # 确保cell有值
-        if cell is None:
-            cell = self.boundary_wall
-
-        # 计算光线距离
-        if side == 0:
-            perp_dist = (map_x - pos_x + (1 - step_x) / 2) / ray_dir_x
-        else:
-            perp_dist = (map_y - pos_y + (1 - step_y) / 2) / ray_dir_y
-
-        # 计算墙面位置
-        if side == 0:
-            wall_x = pos_y + perp_dist * ray_dir_y
-        else:
-            wall_x = pos_x + perp_dist * ray_dir_x
-        wall_x -= math.floor(wall_x)
-
-        return RaycastResult(
-            cell=door_cell or cell,
-            side=side,
-            ray_dir_x=ray_dir_x,
-            ray_dir_y=ray_dir_y,
-            wall_x=wall_x,
-            distance=perp_dist,
-            player_dir_x=raycaster.dir_x,
-            player_dir_y=raycaster.dir_y
-        )
+    @staticmethod
+    def _column_spans(distances, render_height, max_dist=FAR_DISTANCE):
+        """
+        根据各列到墙面的距离批量计算绘制范围，返回 (draw_starts, draw_ends)
+        超出最大距离的列返回空范围 (render_height + 1, render_height)
+        """
+        half_height = render_height // 2
+        max_wall_height = int(render_height * 0.9)
+        half_walls = [min(int(render_height / distance), max_wall_height) // 2 for distance in distances]
+        draw_starts = [max(1, half_height - half_wall) if distance <= max_dist else render_height + 1
+                       for half_wall, distance in zip(half_walls, distances)]
+        draw_ends = [min(render_height, half_height + half_wall) if distance <= max_dist else render_height
+                     for half_wall, distance in zip(half_walls, distances)]
+        return draw_starts, draw_ends
 
     def _render_minimap(self, stdscr, raycaster, offset_x):
-        height, width = stdscr.getmaxyx()
         map_size = 15
         sidebar_width = 30
 
+        player = self.player_info
+        left = offset_x + 2
+        inner_width = sidebar_width - 4
+
+        # 属性不变时直接复用上次格式化好的状态栏文本
+        hud_key = (player.level, player.exp, player.health, player.max_health, player.sp, player.max_sp,
+                   player.attack, player.defense, inner_width)
+        if hud_key != self._hud_key:
+            self._hud_lines = self._build_hud_lines(player, inner_width)
+            self._hud_key = hud_key
+
         try:
-            # 顶部标题（显示等级）
-            title = f"≡ Lv.{self.player_info.level} 玩家状态 ≡"
-            stdscr.addstr(0, offset_x + 2, title.center(sidebar_width - 4))
-
-            # 生命值显示
-            health_percent = self.player_info.health / self.player_info.max_health
-            health_bar_count = max(1, int(health_percent * 10))
-            health_bar = "♥" * health_bar_count
-            health_empty = "♡" * (10 - health_bar_count)
-            health_line = f"生命: {health_bar}{health_empty} {self.player_info.health}/{self.player_info.max_health}"
-            stdscr.addstr(1, offset_x + 2, health_line.ljust(sidebar_width - 4))
-
-            # 技能点显示
-            sp_percent = self.player_info.sp / self.player_info.max_sp
-            sp_bar_count = max(1, int(sp_percent * 10))
-            sp_bar = "✦" * sp_bar_count
-            sp_empty = "✧" * (10 - sp_bar_count)
-            sp_line = f"技能: {sp_bar}{sp_empty} {self.player_info.sp}/{self.player_info.max_sp}"
-            stdscr.addstr(2, offset_x + 2, sp_line.ljust(sidebar_width - 4))
-
-            # 经验值显示
-            exp_progress = self.player_info.get_current_level_progress()
-            exp_bar_count = int(exp_progress * 10)
-            exp_bar = "■" * exp_bar_count
-            exp_empty = "□" * (10 - exp_bar_count)
-
-            # 计算当前等级经验值（确保非负）
-            current_exp = max(0,
-                              self.player_info.exp - self.player_info._exp_required_for_level(self.player_info.level))
-            next_level_exp = self.player_info.get_level_up_exp()
-
-            exp_line = f"经验: {exp_bar}{exp_empty} {current_exp}/{next_level_exp}"
-            stdscr.addstr(3, offset_x + 2, exp_line.ljust(sidebar_width - 4))
-
-            # 攻击和防御显示
-            attack_line = f"攻击: {self.player_info.attack}"
-            defense_line = f"防御: {self.player_info.defense}"
-            stdscr.addstr(4, offset_x + 2, attack_line.ljust(sidebar_width - 4))
-            stdscr.addstr(5, offset_x + 2, defense_line.ljust(sidebar_width - 4))
-
-            # 分隔线
-            separator = "─" * (sidebar_width - 4)
-            stdscr.addstr(6, offset_x + 2, separator)
-
-            # 小地图显示
-            stdscr.addstr(7, offset_x + 2, "小地图:".center(sidebar_width - 4))
-            start_row = 8
-        except:
+            for row, line in enumerate(self._hud_lines):
+                stdscr.addstr(row, left, line)
+        except curses.error:
             return
+        start_row = len(self._hud_lines)
 
         player_x = int(raycaster.pos_x)
         player_y = int(raycaster.pos_y)
 
-        for i in range(map_size):
-            row = []
-            for j in range(map_size):
-                x = j
-                y = map_size - 1 - i
-                if x == player_x and y == player_y:
-                    row.append(self._get_direction_arrow(raycaster.dir_x, raycaster.dir_y))
-                else:
-                    cell = raycaster.game_map.get_cell(x, y)
-                    row.append(cell.get_minimap_char() if cell else " ")
+        # 地图字符行已缓存，只需在玩家所在行盖上方向箭头
+        arrow_row = map_size - 1 - player_y if 0 <= player_x < map_size else -1
+        for i, row in enumerate(raycaster.game_map.get_minimap_rows(map_size)):
+            if i == arrow_row:
+                row = row[:player_x] + self._get_direction_arrow(raycaster.dir_x, raycaster.dir_y) + row[player_x + 1:]
             try:
                 # 使用调整后的起始行
-                stdscr.addstr(i + start_row, offset_x + 2, "".join(row))
-            except:
+                stdscr.addstr(i + start_row, left, row)
+            except curses.error:
                 pass
 
+    @classmethod
+    def _build_hud_lines(cls, player, inner_width):
+        """格式化边栏顶部的状态栏文本（标题、生命、技能、经验、攻防、分隔线和小地图标题）"""
+        # 顶部标题（显示等级）
+        title = f"≡ Lv.{player.level} 玩家状态 ≡"
+
+        # 生命值显示
+        health, max_health = player.health, player.max_health
+        health_bar = cls.HEALTH_BARS[min(10, max(1, int(health / max_health * 10)))]
+        health_line = f"生命: {health_bar} {health}/{max_health}"
+
+        # 技能点显示
+        sp, max_sp = player.sp, player.max_sp
+        sp_bar = cls.SP_BARS[min(10, max(1, int(sp / max_sp * 10)))]
+        sp_line = f"技能: {sp_bar} {sp}/{max_sp}"
+
+        # 经验值显示
+        exp_bar = cls.EXP_BARS[int(player.get_current_level_progress() * 10)]
+        exp_line = f"经验: {exp_bar} {player.get_current_level_exp()}/{player.get_level_up_exp()}"
+
+        return [
+            title.center(inner_width),
+            health_line.ljust(inner_width),
+            sp_line.ljust(inner_width),
+            exp_line.ljust(inner_width),
+            f"攻击: {player.attack}".ljust(inner_width),
+            f"防御: {player.defense}".ljust(inner_width),
+            "─" * inner_width,  # 分隔线
+            "小地图:".center(inner_width),
+        ]
+
     @staticmethod
-    def _get_direction_arrow(dir_x, dir_y):
-        angle = math.degrees(math.atan2(-dir_y, dir_x)) % 360
-        return '↓' if 45 <= angle < 135 else '←' if 135 <= angle < 225 else '↑' if 225 <= angle < 315 else '→'
+    def _get_heading(dir_x, dir_y):
+        """
+        按方向向量的主轴和符号取四向朝向索引：0-东 1-北 2-西 3-南
+        （地图Y轴向下，与 atan2(-dir_y, dir_x) 的四个90度区间一致）
+        """
+        if abs(dir_x) > abs(dir_y):
+            return 0 if dir_x > 0 else 2
+        return 1 if dir_y < 0 else 3
+
+    @classmethod
+    def _get_direction_arrow(cls, dir_x, dir_y):
+        return cls.ARROWS[cls._get_heading(dir_x, dir_y)]
 
     def _render_inventory(self, stdscr, game):
         """渲染物品栏界面（支持滚动）"""
@@ -1276,7 +1727,7 @@ class GameRenderer:
 
         try:
             # 清屏
-            stdscr.clear()
+            stdscr.erase()
 
             # 绘制上边框
             top_border = "█" * width
@@ -1370,9 +1821,6 @@ class GameRenderer:
                 stdscr.addch(y, 0, '█')
                 stdscr.addch(y, width - 1, '█')
 
-            # 刷新屏幕
-            stdscr.refresh()
-
         except curses.error:
             # 忽略curses错误
             pass
@@ -1380,6 +1828,8 @@ class GameRenderer:
 
 # ====================== 10. 主游戏类 ======================
 class RPG:
+    FRAME_INTERVAL = 0.05  # 有动画时的帧间隔（秒），旋转按帧推进，保持原有的20帧/秒
+
     def __init__(self):
         # 游戏状态
         self.running = True
@@ -1403,9 +1853,12 @@ class RPG:
         # 动画系统
         self.animation_renderer = AnimationRenderer()
 
-        # 临时消息
+        # 临时消息（到期前每次渲染时绘制在画面底部）
         self.temp_message = None
-        self.temp_message_time = 0
+        self.temp_message_expiry = 0
+
+        # 画面是否需要重绘（无输入且无动画时跳过渲染）
+        self._dirty = True
 
         # 注册效果函数
         self._register_effect_functions()
@@ -1430,14 +1883,36 @@ class RPG:
 
     def run(self):
         """运行游戏主循环"""
+        self.raycaster.warm_up()  # 在进入curses界面前完成光线投射内核的编译
         curses.wrapper(self._main_loop)
 
+    def _is_animating(self):
+        """是否有需要逐帧推进的动画（旋转、门、物品栏过渡或场景动画）"""
+        return (self.inventory_transition is not None or self.raycaster.rotating
+                or self.game_map.is_animating() or bool(self.animation_renderer.active_animations))
+
+    def _next_frame_timeout(self, frame_start):
+        """
+        计算下一次 getch 的等待时间（毫秒）
+        有动画时按帧间隔扣除本帧已用时间；只有临时消息时等到其过期；完全空闲时阻塞等待输入（-1）
+        """
+        if self._is_animating():
+            return max(0, int((frame_start + self.FRAME_INTERVAL - time.time()) * 1000))
+        if self.temp_message is not None:
+            return max(0, int((self.temp_message_expiry - time.time()) * 1000))
+        return -1
+
     def _main_loop(self, stdscr):
         curses.curs_set(0)
         stdscr.nodelay(1)
+        idle_wait = False
         while self.running:
-            delta_time = time.time() - self.last_frame_time
-            self.last_frame_time = time.time()
+            frame_start = time.time()
+            delta_time = frame_start - self.last_frame_time
+            self.last_frame_time = frame_start
+
+            # 本帧开始时仍有动画在播放，则更新后需要重绘（包括动画结束的最后一帧）
+            animating = self._is_animating()
 
             # 更新过渡动画状态
             if self.inventory_transition:
@@ -1445,8 +1920,19 @@ class RPG:
                 if self.inventory_transition.completed:
                     self.inventory_transition = None
 
+            # 临时消息到期后重绘一帧以清除
+            if self.temp_message is not None and self.last_frame_time >= self.temp_message_expiry:
+                self.temp_message = None
+                self._dirty = True
+
             # 处理输入
             key = stdscr.getch()
+            if idle_wait:
+                # 空闲阻塞期间没有任何动画，等待时长不计入本帧，避免按键触发的动画第一帧跳过一大段
+                self.last_frame_time = time.time()
+                delta_time = 0.0
+            if key != -1 or animating:
+                self._dirty = True
             if key == ord('q'):
                 self.running = False
             elif key == ord('i') and not self.inventory_transition:
@@ -1469,14 +1955,14 @@ class RPG:
                         if selected_item.item_type == "consumable":
                             # 使用消耗品
                             result = self._use_consumable(selected_item)
-                            self._show_temp_message(stdscr, result)
+                            self._show_temp_message(result)
                         elif selected_item.item_type == "equipment":
                             # 装备/卸下装备
                             if selected_item.equipped:
                                 result = inventory.unequip_item(selected_item, self)
                             else:
                                 result = inventory.equip_item(selected_item, self)
-                            self._show_temp_message(stdscr, result)
+                            self._show_temp_message(result)
             elif not self.inventory_transition:
                 # 游戏界面输入处理
                 if key == ord('w'):
@@ -1487,34 +1973,48 @@ class RPG:
                     self.raycaster.rotate(clockwise=False)  # 向左转
                 elif key == ord('d'):
                     self.raycaster.rotate(clockwise=True)  # 向右转
-                elif key == ord(' '):  # 空格键交互
-                    front_cell = self.raycaster.get_front_cell()
-                    if front_cell and front_cell.behavior:
-                        # 获取玩家前方位置
-                        front_x = int(self.raycaster.pos_x + self.raycaster.dir_x * 0.7)
-                        front_y = int(self.raycaster.pos_y + self.raycaster.dir_y * 0.7)
-                        front_cell.behavior.on_interact(self, front_x, front_y)
+                elif key == ord(' '):  # 空格键交互：只访问玩家前方的单元格
+                    front_x = int(self.raycaster.pos_x + self.raycaster.dir_x * 0.7)
+                    front_y = int(self.raycaster.pos_y + self.raycaster.dir_y * 0.7)
+                    self.game_map.visit_at(InteractionHandler(self), front_x, front_y)
 
             # 更新旋转动画
             self.raycaster.update_rotation()
 
-            # 更新地图行为
-            self.game_map.accept_visitor(AnimationUpdater(delta_time))
+            # 更新地图行为（只推进正在播放动画的单元格）
+            self.game_map.update_animations(delta_time)
 
-            # 渲染游戏
-            if not self.inventory_open:
-                self.renderer.render_game(stdscr, self)
+            # 画面无变化时跳过整帧渲染，上一帧内容保留在屏幕上
+            if self._dirty:
+                self._dirty = False
 
-            # 渲染物品栏界面（覆盖整个画面）
-            if self.inventory_open:
-                self.renderer._render_inventory(stdscr, self)
+                # 渲染游戏
+                if not self.inventory_open:
+                    self.renderer.render_game(stdscr, self)
 
-            # 渲染过渡动画（覆盖在最上层）
-            if self.inventory_transition:
-                self.inventory_transition.render(stdscr, self)
+                # 渲染物品栏界面（覆盖整个画面）
+                if self.inventory_open:
+                    self.renderer._render_inventory(stdscr, self)
+
+                # 临时消息
+                if self.temp_message is not None:
+                    self._render_temp_message(stdscr)
+
+                # 更新并渲染场景动画（如闪屏）
+                self.animation_renderer.tick(stdscr, self, delta_time)
 
-            # 设置超时
-            stdscr.timeout(50)
+                # 渲染过渡动画（覆盖在最上层）
+                if self.inventory_transition:
+                    self.inventory_transition.render(stdscr, self)
+
+                # 所有图层绘制完毕后一次性输出到终端
+                stdscr.noutrefresh()
+                curses.doupdate()
+
+            # 设置超时（帧节奏）
+            timeout = self._next_frame_timeout(frame_start)
+            idle_wait = timeout < 0
+            stdscr.timeout(timeout)
 
     def _use_consumable(self, item: Item) -> str:
         """使用消耗品"""
@@ -1535,23 +2035,10 @@ class RPG:
                 else:
                     results.append(f"未知效果函数: {effect.value}")
             else:
-                # 数值效果
-                if effect.effect_type == "health":
-                    player.heal(effect.value)
-                elif effect.effect_type == "sp":
-                    player.restore_sp(effect.value)
-                elif effect.effect_type == "exp":
-                    player.add_exp(effect.value)
-                elif effect.effect_type == "attack":
-                    player.attack += effect.value
-                elif effect.effect_type == "defense":
-                    player.defense += effect.value
-                elif effect.effect_type == "max_health":
-                    player.max_health += effect.value
-                    player.health = min(player.health, player.max_health)
-                elif effect.effect_type == "max_sp":
-                    player.max_sp += effect.value
-                    player.sp = min(player.sp, player.max_sp)
+                # 数值效果（未知类型忽略）
+                applier = CONSUMABLE_EFFECT_APPLIERS.get(effect.effect_type)
+                if applier:
+                    applier(player, effect.value)
 
         # 减少数量（如果是有限使用物品）
         if item.usage_type == "single":
@@ -1580,30 +2067,21 @@ class RPG:
 
         return f"使用了 {item.name}: {effects}"
 
-    def _show_temp_message(self, stdscr, message: str, duration: float = 1.5):
-        """显示临时消息"""
+    def _show_temp_message(self, message: str, duration: float = 1.5):
+        """显示临时消息（不阻塞主循环，到期后自动消失）"""
+        self.temp_message = message
+        self.temp_message_expiry = time.time() + duration
+        self._dirty = True
+
+    def _render_temp_message(self, stdscr):
+        """在画面底部绘制临时消息"""
         height, width = stdscr.getmaxyx()
         try:
-            # 在屏幕底部显示消息
             msg_y = height - 3
-            msg_x = max(0, (width - len(message)) // 2)
-
-            # 保存原始内容
-            original_line = stdscr.instr(msg_y, 0, width - 1).decode('utf-8', 'ignore').rstrip()
-
-            # 显示消息
-            stdscr.addstr(msg_y, msg_x, message)
-            stdscr.refresh()
-
-            # 短暂延迟
-            time.sleep(duration)
-
-            # 恢复原始内容
-            stdscr.addstr(msg_y, 0, original_line)
-            stdscr.refresh()
-        except:
+            msg_x = max(0, (width - len(self.temp_message)) // 2)
+            stdscr.addstr(msg_y, msg_x, self.temp_message)
+        except curses.error:
             pass
 
-
 if __name__ == "__main__":
     RPG().run()